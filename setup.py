@@ -8,10 +8,20 @@ setup(
     install_requires=[
         "langchain>=0.1.0",
         "langchain-openai>=0.0.5",
+        "httpx[http2]>=0.24.0",
         "langchain-google-community>=0.0.1",
         "python-dotenv>=1.0.0",
         "beautifulsoup4>=4.12.0",
+        "lxml>=4.9.0",
     ],
+    extras_require={
+        # Faster HTML-to-text for HTML-only emails, and single-pass
+        # sanitizing with hyperscan (x86-64 only)
+        "fast": [
+            "selectolax>=0.3.12",
+            "hyperscan>=0.4.0; platform_machine == 'x86_64' or platform_machine == 'AMD64'",
+        ],
+    },
     python_requires=">=3.8",
     author="Your Name",
     description="AI agent for Gmail management with send/draft capabilities (no Google Cloud Console)",
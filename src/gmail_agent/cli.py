@@ -1,7 +1,33 @@
 """Interactive Natural Language CLI for Gmail AI Agent"""
 
+import re
 import sys
-from .agent import GmailAIAgent
+import argparse
+
+
+# Fixed-intent requests that are answered without the LLM planner.
+# Patterns must match the whole input so anything richer falls through.
+FAST_PATHS = [
+    (
+        re.compile(
+            r"^(?:(?:can you|could you|please)\s+)*"
+            r"(?:(?:show|summari[sz]e|list|get|check|read|fetch)\s+(?:me\s+)?(?:my\s+|all\s+)*"
+            r"(?:unread|new)|(?:my\s+|all\s+)*unread)"
+            r"\s+(?:e-?mails?|mails?|messages?)\s*[.!?]*$",
+            re.IGNORECASE,
+        ),
+        lambda agent, match: agent.summarize_unread(),
+    ),
+    (
+        re.compile(
+            r"^(?:(?:can you|could you|please)\s+)*summari[sz]e\s+(?:my\s+)?"
+            r"(?:(?:last|latest|recent)\s+)?(?:(?P<count>\d{1,3})\s+)?"
+            r"(?:inbox|e-?mails?|mails?|messages?)\s*[.!?]*$",
+            re.IGNORECASE,
+        ),
+        lambda agent, match: agent.summarize_inbox(int(match.group("count") or 10)),
+    ),
+]
 
 
 def print_header():
@@ -35,15 +61,45 @@ def is_exit_command(text):
     return text.lower().strip() in exit_words
 
 
+def is_confirmation(text):
+    """Check if user is confirming a previously proposed action"""
+    confirm_words = ['yes', 'y', 'confirm', 'go ahead', 'proceed']
+    return text.lower().strip(" .!") in confirm_words
+
+
+def route_fast_path(agent, text):
+    """Answer fixed-intent requests directly, or return None to use the agent"""
+    for pattern, handler in FAST_PATHS:
+        match = pattern.match(text)
+        if match:
+            return handler(agent, match)
+    return None
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Gmail AI Agent - Conversational Mode")
+    parser.add_argument(
+        "--auto-confirm",
+        action="store_true",
+        help="send emails without the YES prompt (for unattended runs)"
+    )
+    return parser.parse_args(argv)
+
+
 def main():
     """Main CLI function with natural language support"""
+    args = parse_args()
     print_header()
     
+    # Imported here so the banner shows before langchain & co. finish loading
+    from .agent import GmailAIAgent
+    
     print("\n Initializing agent...")
     print("(First-time users: Make sure you've set up Gmail App Password)")
     
     try:
-        agent = GmailAIAgent()
+        agent = GmailAIAgent(auto_confirm=args.auto_confirm or None)
         print(" Agent initialized successfully!\n")
     except ValueError as e:
         print(f"\n Configuration Error: {e}")
@@ -82,9 +138,21 @@ def main():
             print("\n Agent: ", end="", flush=True)
             
             try:
-                # The agent handles natural language directly
-                response = agent.run(user_input)
-                print(response)
+                # Confirming a cancelled send and fixed intents skip the planner;
+                # the agent handles everything else
+                if agent.pending_send and is_confirmation(user_input):
+                    response = agent.send_pending()
+                else:
+                    # Any other turn drops the offer to retry a cancelled send
+                    agent.pending_send = None
+                    response = route_fast_path(agent, user_input)
+                if response is None:
+                    # Print the answer as it is generated
+                    for chunk in agent.stream(user_input):
+                        print(chunk, end="", flush=True)
+                    print()
+                else:
+                    print(response)
             except Exception as e:
                 print(f"\n Error processing your request: {e}")
                 print("Please try rephrasing your question or type 'help' for examples.")
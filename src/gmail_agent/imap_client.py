@@ -1,39 +1,522 @@
 """IMAP and SMTP clients for Gmail access without Google Cloud Console"""
 
+import os
+import json
+import hashlib
 import imaplib
 import smtplib
 import email
 from email.header import decode_header
+from email.parser import BytesHeaderParser
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple, Union
 import re
 import time
-from bs4 import BeautifulSoup
+import select
+import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Upper bound on message ids per FETCH command
+FETCH_BATCH_SIZE = 100
+
+# UID SEARCH results are reused this long (seconds) while the folder's
+# message count and UIDNEXT are unchanged
+SEARCH_CACHE_TTL = 30
+SEARCH_CACHE_SIZE = 64
+
+# Connections opened at once by fetch_emails_multi (Gmail allows 15 per account)
+MAX_PARALLEL_CONNECTIONS = 5
+
+IMAP_HOST = "imap.gmail.com"
+IMAP_PORT = 993
+
+# Gmail drops sessions idle for ~29 minutes; pooled connections idle longer
+# than this are checked with NOOP before being handed out again
+POOL_NOOP_AFTER = 25 * 60
+
+# RFC 2177: clients should re-issue IDLE at least every 29 minutes
+IDLE_TIMEOUT = 29 * 60
+# Seconds between checks of a stream's stop event while idling
+IDLE_POLL = 1
+
+# Untagged responses that mean the selected mailbox changed
+_IDLE_CHANGE_RE = re.compile(rb'^\* \d+ (EXISTS|RECENT|EXPUNGE)\b', re.IGNORECASE)
+
+# Only the header fields _parse_email reads, plus the MIME fields needed to
+# decode the body (PEEK leaves \Seen untouched)
+HEADER_FIELDS = ("BODY.PEEK[HEADER.FIELDS (FROM TO SUBJECT DATE "
+                 "MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING)]")
+
+# Bytes of body text downloaded per message; bodies are cut to 5000
+# characters after decoding anyway
+BODY_FETCH_LIMIT = 8192
+
+# Headers plus the first 2 KB of the body: enough for summaries (the agent
+# trims bodies to 1000 characters) without downloading attachments
+PREVIEW_FETCH_PARTS = f"({HEADER_FIELDS} BODY.PEEK[TEXT]<0.2048>)"
+
+# "12 (" opens the response for message 12
+_FETCH_START_RE = re.compile(rb'^(\d+) \(')
+# "UID 345" inside a UID FETCH response
+_FETCH_UID_RE = re.compile(rb'[( ]UID (\d+)')
+# "BODY[HEADER] {342}" / "BODY[TEXT]<0> {2048}" / "RFC822 {9120}" precede a literal
+# (BODY[HEADER.FIELDS (...)] is stored as BODY[HEADER])
+_FETCH_SECTION_RE = re.compile(rb'(BODY\[[^\]]*\]|RFC822(?:\.HEADER|\.TEXT)?)(?:<\d+>)? \{\d+\}$')
+
+# One token of an IMAP response: "(", ")", quoted string, literal, or atom/NIL
+_IMAP_TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}\r\n|([^\s()"]+))')
+# Content header fields (with folded continuation lines) of a raw header block
+_CONTENT_HEADER_RE = re.compile(rb'^Content-(?:Type|Transfer-Encoding):[^\n]*\n(?:[ \t][^\n]*\n)*',
+                                re.IGNORECASE | re.MULTILINE)
+
+# Sanitizer patterns, compiled once; the suspicious phrases share one
+# alternation so each body is scanned in a single pass
+_SUSPICIOUS_PATTERNS = (
+    r'SYSTEM OVERRIDE',
+    r'IGNORE.*PREVIOUS.*INSTRUCTIONS',
+    r'NEW INSTRUCTION',
+    r'IMPORTANT SYSTEM',
+    r'SYSTEM CONTEXT UPDATE',
+    r'CRITICAL SYSTEM',
+    r'OVERRIDE:',
+    r'REASONING OVERRIDE',
+)
+_SUSPICIOUS_RE = re.compile("|".join(_SUSPICIOUS_PATTERNS), re.IGNORECASE)
+_SUSPICIOUS_MARKER = '[REMOVED_SUSPICIOUS_CONTENT]'
+# Deletes zero-width characters in one str.translate pass
+_ZW_TABLE = str.maketrans('', '', '\u200b\u200c\u200d\ufeff')
+# Blank-line runs to collapse to one empty line; a bare "\n\n" already is one,
+# so bodies without longer runs come back from sub() uncopied
+_NEWLINE_RE = re.compile(r'\n\s+\n')
+
+# HTML-to-text backend, chosen on first use: selectolax (optional "fast" extra)
+# when installed, else BeautifulSoup with the C-based lxml parser, else
+# BeautifulSoup with the much slower pure-Python html.parser
+_html_parser = None
+
+# Hyperscan database of the suspicious patterns (optional "fast" extra),
+# compiled on first use; False when hyperscan is not installed. Scratch
+# space cannot be shared between concurrent scans, so each thread has its own
+_hs_db = None
+_hs_local = threading.local()
+
+
+def _parse_imap_list(buf: bytes, pos: int = 0):
+    """
+    Parse one IMAP value (nested lists of str/None) starting at pos
+    
+    Returns:
+        Tuple of (value, end position)
+    """
+    stack = [[]]
+    while True:
+        match = _IMAP_TOKEN_RE.match(buf, pos)
+        if not match:
+            raise ValueError(f"Malformed IMAP response at offset {pos}")
+        pos = match.end()
+        open_paren, close_paren, quoted, literal, atom = match.groups()
+        
+        if open_paren:
+            stack.append([])
+            continue
+        if close_paren:
+            if len(stack) == 1:
+                raise ValueError(f"Unbalanced ')' at offset {pos}")
+            value = stack.pop()
+        elif quoted is not None:
+            value = re.sub(rb'\\(.)', rb'\1', quoted).decode("utf-8", errors="replace")
+        elif literal is not None:
+            size = int(literal)
+            value = buf[pos:pos + size].decode("utf-8", errors="replace")
+            pos += size
+        else:
+            value = None if atom.upper() == b"NIL" else atom.decode("utf-8", errors="replace")
+        
+        if len(stack) == 1:
+            return value, pos
+        stack[-1].append(value)
+
+
+def _pick_html_parser() -> str:
+    """Return the fastest installed HTML-to-text backend"""
+    try:
+        import selectolax.parser  # noqa: F401
+        return "selectolax"
+    except ImportError:
+        pass
+    
+    from bs4 import BeautifulSoup, FeatureNotFound
+    try:
+        BeautifulSoup("", "lxml")
+        return "lxml"
+    except FeatureNotFound:
+        return "html.parser"
+
+
+def _html_to_text(html_body: str) -> str:
+    """Convert HTML to plain text (parsers only loaded when needed)"""
+    global _html_parser
+    if _html_parser is None:
+        _html_parser = _pick_html_parser()
+    
+    if _html_parser == "selectolax":
+        # Extracts text straight from the Modest engine's C DOM, without a Python-level tree
+        from selectolax.parser import HTMLParser
+        tree = HTMLParser(html_body)
+        tree.strip_tags(["script", "style"])
+        if tree.root is None:
+            return ""
+        return tree.root.text(separator="\n", strip=True)
+    
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_body, _html_parser)
+    return soup.get_text(separator="\n", strip=True)
+
+
+def _compile_hyperscan():
+    """Compile the suspicious patterns with hyperscan, or return False if it is unusable"""
+    try:
+        import hyperscan
+    except ImportError:
+        return False
+    
+    db = hyperscan.Database()
+    try:
+        db.compile(
+            expressions=[p.encode() for p in _SUSPICIOUS_PATTERNS],
+            ids=list(range(len(_SUSPICIOUS_PATTERNS))),
+            elements=len(_SUSPICIOUS_PATTERNS),
+            # SOM_LEFTMOST reports where each match starts, not just where it ends
+            flags=hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST,
+        )
+    except hyperscan.error as e:
+        print(f"Warning: hyperscan cannot compile the sanitizer patterns ({e}); using re")
+        return False
+    return db
+
+
+def _strip_html_comments(content: str, limit: int) -> Tuple[str, bool]:
+    """
+    Remove <!-- ... --> comments, stopping once limit characters are kept
+    
+    Gives the same text as removing every comment and then cutting, without
+    scanning past the part that is kept. An unterminated "<!--" is left as
+    is, like the non-greedy regex this replaces.
+    
+    Returns:
+        (text, whether anything was cut)
+    """
+    out = []
+    kept = 0
+    pos = 0
+    # One character past the limit tells whether anything was cut
+    while kept <= limit:
+        start = content.find("<!--", pos)
+        end = content.find("-->", start + 4) if start != -1 else -1
+        if end == -1:
+            start = len(content)
+        piece = content[pos:start]
+        out.append(piece)
+        kept += len(piece)
+        if end == -1:
+            break
+        pos = end + 3
+    text = "".join(out)
+    return text[:limit], len(text) > limit
+
+
+def _remove_suspicious(content: str) -> str:
+    """Replace suspicious phrases with a marker, scanning with hyperscan when available"""
+    global _hs_db
+    if _hs_db is None:
+        _hs_db = _compile_hyperscan()
+    # Hyperscan folds ASCII case only, while re.IGNORECASE also matches e.g.
+    # "\u017f" (long s) for "s" and "\u0131" (dotless i) for "i"
+    if not _hs_db or not content.isascii():
+        return _SUSPICIOUS_RE.sub(_SUSPICIOUS_MARKER, content)
+    
+    scratch = getattr(_hs_local, "scratch", None)
+    if scratch is None:
+        import hyperscan
+        scratch = _hs_local.scratch = hyperscan.Scratch(_hs_db)
+    
+    data = content.encode("utf-8")
+    # start -> furthest end: hyperscan reports every match (e.g. each
+    # INSTRUCTIONS after an IGNORE), re's greedy .* takes the longest
+    ends: Dict[int, int] = {}
+    
+    def on_match(_id, start, end, _flags, _context):
+        if end > ends.get(start, -1):
+            ends[start] = end
+    
+    _hs_db.scan(data, match_event_handler=on_match, scratch=scratch)
+    if not ends:
+        return content
+    
+    # Pick matches the way re.sub does: leftmost first, then resume after it,
+    # so a phrase overlapping a replaced one (the "OVERRIDE:" in
+    # "SYSTEM OVERRIDE:") is left alone
+    marker = _SUSPICIOUS_MARKER.encode()
+    out = []
+    pos = 0
+    for start in sorted(ends):
+        if start < pos:
+            continue
+        out += (data[pos:start], marker)
+        pos = ends[start]
+    out.append(data[pos:])
+    return b"".join(out).decode("utf-8")
+
+
+def _imap_quote(value: str) -> str:
+    """Quote an ASCII string for an IMAP command (CR/LF are not allowed)"""
+    value = value.replace("\r", " ").replace("\n", " ")
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _text_search(keys: List[str], value: str):
+    """
+    Build search criteria matching value in any of the given search keys
+    
+    ASCII values become one quoted criteria string. Other values must be sent
+    as UTF-8 literals, and imaplib sends at most one literal per command, so
+    they become a list of (key, literal) searches whose results are merged.
+    """
+    try:
+        quoted = _imap_quote(value)
+        quoted.encode("ascii")
+    except UnicodeEncodeError:
+        literal = value.replace("\r", " ").replace("\n", " ").encode("utf-8")
+        return [(key, literal) for key in keys]
+    
+    criteria = f"{keys[-1]} {quoted}"
+    for key in reversed(keys[:-1]):
+        criteria = f"OR {key} {quoted} {criteria}"
+    return criteria
+
+
+def _decode_header_value(header_value) -> str:
+    """Decode email header"""
+    if not header_value:
+        return ""
+    
+    decoded_parts = decode_header(header_value)
+    parts_out = []
+    
+    for part, encoding in decoded_parts:
+        if isinstance(part, bytes):
+            if encoding is None:
+                # Unencoded text between encoded words: decode_header returns
+                # it as raw-unicode-escape bytes, which latin-1 maps back 1:1
+                parts_out.append(part.decode("latin-1"))
+                continue
+            try:
+                parts_out.append(part.decode(encoding, errors="ignore"))
+            except LookupError:
+                # Unknown charset (e.g. "unknown-8bit"): usually UTF-8
+                try:
+                    parts_out.append(part.decode("utf-8"))
+                except UnicodeDecodeError:
+                    parts_out.append(part.decode("latin-1"))
+        else:
+            parts_out.append(str(part))
+    
+    return "".join(parts_out)
+
+
+class Email:
+    """
+    A parsed email; From/To/Subject are decoded on first access
+    
+    Records use __slots__ rather than a per-email dict. They support the
+    read-only mapping API (email["subject"], get, keys, items, values,
+    iteration over keys), so code written against the old dictionaries keeps
+    working; they are not dict instances, so use to_dict() for json.dumps or
+    anything else that checks the type.
+    """
+    
+    __slots__ = ("uid", "date", "body",
+                 "_raw_from", "_raw_to", "_raw_subject", "_from", "_to", "_subject")
+    
+    # Item keys, in the order of the old dictionaries
+    FIELDS = ("uid", "from", "to", "subject", "date", "body")
+    
+    def __init__(self, uid: str, raw_from: str, raw_to: str, raw_subject: str,
+                 date: str, body: str):
+        self.uid = uid
+        self.date = date
+        self.body = body
+        self._raw_from = raw_from
+        self._raw_to = raw_to
+        self._raw_subject = raw_subject
+        self._from = self._to = self._subject = None
+    
+    @property
+    def from_(self) -> str:
+        """Decoded From header"""
+        if self._from is None:
+            self._from = _decode_header_value(self._raw_from)
+        return self._from
+    
+    @property
+    def to(self) -> str:
+        """Decoded To header"""
+        if self._to is None:
+            self._to = _decode_header_value(self._raw_to)
+        return self._to
+    
+    @property
+    def subject(self) -> str:
+        """Decoded Subject header"""
+        if self._subject is None:
+            self._subject = _decode_header_value(self._raw_subject)
+        return self._subject
+    
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, "from_" if key == "from" else key)
+    
+    def __contains__(self, key) -> bool:
+        return key in self.FIELDS
+    
+    def get(self, key: str, default=None):
+        return self[key] if key in self.FIELDS else default
+    
+    def __iter__(self):
+        return iter(self.FIELDS)
+    
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+    
+    def keys(self):
+        return list(self.FIELDS)
+    
+    def values(self):
+        return [self[key] for key in self.FIELDS]
+    
+    def items(self):
+        return [(key, self[key]) for key in self.FIELDS]
+    
+    def to_dict(self) -> Dict[str, str]:
+        """Plain dictionary with every header decoded"""
+        return {key: self[key] for key in self.FIELDS}
+    
+    def __eq__(self, other):
+        if not isinstance(other, Email):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"Email(uid={self.uid!r}, from_={self.from_!r}, subject={self.subject!r}, date={self.date!r})"
+
+
+class _ConnectionPool:
+    """
+    Logged-in IMAP connections kept for reuse
+    
+    Connections are keyed by host, email and a hash of the password they
+    logged in with, so only a client holding the same credentials gets one.
+    """
+    
+    def __init__(self, max_idle: int = MAX_PARALLEL_CONNECTIONS):
+        self.max_idle = max_idle
+        self._idle: Dict[Tuple[str, str, str], List[Tuple[imaplib.IMAP4_SSL, float]]] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(host: str, email_address: str, app_password: str) -> Tuple[str, str, str]:
+        """Pool key; only the password's hash is kept"""
+        return host, email_address, hashlib.sha256(app_password.encode()).hexdigest()
+    
+    def get(self, host: str, email_address: str, app_password: str) -> imaplib.IMAP4_SSL:
+        """Return an idle live connection for the account, or log in a new one"""
+        key = self._key(host, email_address, app_password)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                conn, last_used = idle.pop()
+            
+            if time.monotonic() - last_used < POOL_NOOP_AFTER:
+                return conn
+            try:
+                conn.noop()
+                return conn
+            except (imaplib.IMAP4.error, OSError):
+                self.discard(conn)
+        
+        conn = imaplib.IMAP4_SSL(host, IMAP_PORT)
+        conn.login(email_address, app_password)
+        return conn
+    
+    def put(self, host: str, email_address: str, app_password: str,
+            conn: imaplib.IMAP4_SSL) -> None:
+        """Keep an authenticated connection for the next get() with these credentials"""
+        key = self._key(host, email_address, app_password)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.monotonic()))
+                return
+        self.discard(conn)
+    
+    def discard(self, conn: imaplib.IMAP4_SSL) -> None:
+        """Log out a connection that will not be reused"""
+        try:
+            conn.logout()
+        except Exception:
+            pass
+
+
+# Shared by every client in the process, so reconnecting (or opening a client
+# per task) skips the TLS handshake and LOGIN when a connection is idle
+_pool = _ConnectionPool()
 
 
 class GmailIMAPClient:
     """Gmail IMAP client for reading emails"""
     
-    def __init__(self, email_address: str, app_password: str):
+    def __init__(self, email_address: str, app_password: str,
+                 fetch_batch_size: int = FETCH_BATCH_SIZE,
+                 state_file: Optional[str] = None):
         """
         Initialize Gmail IMAP client
         
         Args:
             email_address: Gmail email address
             app_password: Gmail App Password (16-character password)
+            fetch_batch_size: Maximum message ids per FETCH command
+            state_file: Optional JSON file remembering the last UID seen per
+                folder, so fetch_new_emails stays incremental across runs
         """
         self.email_address = email_address
         self.app_password = app_password
+        self.fetch_batch_size = fetch_batch_size
+        self.state_file = state_file
+        # folder -> UIDVALIDITY from the last SELECT
+        self._uidvalidity: Dict[str, str] = {}
+        # folder -> UIDNEXT when it was last searched (see idle)
+        self._uidnext: Dict[str, bytes] = {}
+        # folder -> (UIDVALIDITY, highest UID returned by fetch_new_emails)
+        self._last_seen: Dict[str, Tuple[str, int]] = self._load_state()
+        # (folder, criteria) -> (folder state, time, UIDs)
+        self._search_cache: Dict[tuple, Tuple[tuple, float, List[bytes]]] = {}
         self.imap = None
         self.connected = False
+        # imaplib connections are not thread-safe; guard every command
+        self._lock = threading.RLock()
     
     def connect(self):
         """Connect to Gmail IMAP server"""
         try:
-            self.imap = imaplib.IMAP4_SSL("imap.gmail.com", 993)
-            self.imap.login(self.email_address, self.app_password)
+            self.imap = _pool.get(IMAP_HOST, self.email_address, self.app_password)
             self.connected = True
             print(f"Connected to Gmail as {self.email_address}")
             return self
@@ -90,223 +573,786 @@ class GmailIMAPClient:
             raise ConnectionError(f"Failed to connect to Gmail: {str(e)}")
     
     def disconnect(self):
-        """Disconnect from Gmail"""
-        if self.imap and self.connected:
-            try:
-                self.imap.close()
-                self.imap.logout()
+        """Disconnect from Gmail (the logged-in connection goes back to the pool)"""
+        with self._lock:
+            if self.imap and self.connected:
+                try:
+                    if self.imap.state == "SELECTED":
+                        self.imap.close()
+                    _pool.put(IMAP_HOST, self.email_address, self.app_password, self.imap)
+                except Exception:
+                    _pool.discard(self.imap)
+                self.imap = None
                 self.connected = False
-            except:
-                pass
+    
+    def reconnect(self):
+        """Drop the current connection (if any) and log in again"""
+        with self._lock:
+            if self.imap:
+                _pool.discard(self.imap)
+            self.connected = False
+            return self.connect()
+    
+    def noop(self):
+        """Send NOOP to keep the connection alive, reconnecting if it was dropped"""
+        with self._lock:
+            if not self.connected:
+                return
+            try:
+                self.imap.noop()
+            except (imaplib.IMAP4.abort, OSError):
+                self.reconnect()
     
     def _decode_header(self, header_value):
         """Decode email header"""
-        if not header_value:
-            return ""
-        
-        decoded_parts = decode_header(header_value)
-        decoded_string = ""
-        
-        for part, encoding in decoded_parts:
-            if isinstance(part, bytes):
-                try:
-                    decoded_string += part.decode(encoding or "utf-8", errors="ignore")
-                except:
-                    decoded_string += part.decode("utf-8", errors="ignore")
-            else:
-                decoded_string += str(part)
-        
-        return decoded_string
+        return _decode_header_value(header_value)
     
     def _sanitize_email_content(self, content: str) -> str:
         """Remove potentially malicious instructions from email content"""
+        max_length = 5000
         
-        # Remove HTML comments
-        content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
+        # Remove HTML comments. Only the first max_length characters are
+        # kept, so stop early and never scan multi-megabyte bodies (the slack
+        # leaves room for the removals below)
+        content, cut = _strip_html_comments(content, max_length * 2)
         
         # Remove hidden/suspicious patterns
-        suspicious_patterns = [
-            r'SYSTEM OVERRIDE',
-            r'IGNORE.*PREVIOUS.*INSTRUCTIONS',
-            r'NEW INSTRUCTION',
-            r'IMPORTANT SYSTEM',
-            r'SYSTEM CONTEXT UPDATE',
-            r'CRITICAL SYSTEM',
-            r'OVERRIDE:',
-            r'REASONING OVERRIDE',
-        ]
-        
-        for pattern in suspicious_patterns:
-            content = re.sub(pattern, '[REMOVED_SUSPICIOUS_CONTENT]', 
-                            content, flags=re.IGNORECASE)
+        content = _remove_suspicious(content)
         
         # Remove zero-width characters
-        zero_width_chars = ['\u200b', '\u200c', '\u200d', '\ufeff']
-        for char in zero_width_chars:
-            content = content.replace(char, '')
+        content = content.translate(_ZW_TABLE)
         
         # Limit content length to prevent prompt stuffing
-        max_length = 5000
-        if len(content) > max_length:
+        if cut or len(content) > max_length:
             content = content[:max_length] + "\n[Content truncated for safety]"
         
         return content
     
+    def _decode_payload(self, part) -> str:
+        """Decode a part's payload using the charset it declares (default UTF-8)"""
+        payload = part.get_payload(decode=True)
+        if not payload:
+            return ""
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            return payload.decode(charset, errors="replace")
+        except LookupError:
+            # Unknown charset name
+            return payload.decode("utf-8", errors="replace")
+    
+    def _find_text_part(self, msg, content_type: str) -> Optional[str]:
+        """Decoded payload of the first inline part of content_type, or None"""
+        # walk() is a generator: returning stops before later parts are visited
+        for part in msg.walk():
+            if part.get_content_type() != content_type:
+                continue
+            if "attachment" in str(part.get("Content-Disposition")):
+                continue
+            try:
+                return self._decode_payload(part)
+            except Exception:
+                continue
+        return None
+    
     def _extract_email_body(self, msg):
         """Extract email body from message"""
         body = ""
         
         if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                content_disposition = str(part.get("Content-Disposition"))
-                
-                if content_type == "text/plain" and "attachment" not in content_disposition:
-                    try:
-                        body = part.get_payload(decode=True).decode("utf-8", errors="ignore")
-                        break
-                    except:
-                        pass
-                elif content_type == "text/html" and not body:
-                    try:
-                        html_body = part.get_payload(decode=True).decode("utf-8", errors="ignore")
-                        # Convert HTML to plain text
-                        soup = BeautifulSoup(html_body, "html.parser")
-                        body = soup.get_text(separator="\n", strip=True)
-                    except:
-                        pass
+            # Plain text wins; HTML is only looked for (and parsed) without it
+            body = self._find_text_part(msg, "text/plain")
+            if not body:
+                html_body = self._find_text_part(msg, "text/html")
+                try:
+                    body = _html_to_text(html_body) if html_body else ""
+                except Exception:
+                    body = ""
         else:
             try:
-                payload = msg.get_payload(decode=True)
-                if payload:
-                    body = payload.decode("utf-8", errors="ignore")
+                body = self._decode_payload(msg)
             except:
                 body = str(msg.get_payload())
         
         # Clean up body
-        body = re.sub(r'\n\s*\n', '\n\n', body)  # Remove excessive newlines
+        body = _NEWLINE_RE.sub('\n\n', body)  # Remove excessive newlines
         return body.strip()
     
-    def _parse_email(self, msg_data, uid) -> Dict:
-        """Parse email message into dictionary"""
-        msg = email.message_from_bytes(msg_data)
+    def _parse_email(self, msg_data, uid, headers_only: bool = False) -> Email:
+        """Parse email message into an Email (headers are decoded lazily)"""
+        if headers_only:
+            # Stops at the blank line; the body is never MIME-parsed
+            msg = BytesHeaderParser().parsebytes(msg_data)
+        else:
+            msg = email.message_from_bytes(msg_data)
         
-        # Extract headers
-        subject = self._decode_header(msg.get("Subject", ""))
-        from_header = self._decode_header(msg.get("From", ""))
-        to_header = self._decode_header(msg.get("To", ""))
         date_header = msg.get("Date", "")
         
-        # Parse date
+        # Parse date (shown in local time, with its UTC offset)
         try:
-            date_tuple = email.utils.parsedate_tz(date_header)
-            if date_tuple:
-                timestamp = email.utils.mktime_tz(date_tuple)
-                date_obj = datetime.fromtimestamp(timestamp)
-            else:
-                date_obj = datetime.now()
-        except:
-            date_obj = datetime.now()
-        
-        # Extract body
-        body = self._extract_email_body(msg)
+            date_obj = email.utils.parsedate_to_datetime(date_header)
+            if date_obj.tzinfo is None:
+                # "-0000" means UTC with the sender's zone unknown, not local time
+                date_obj = date_obj.replace(tzinfo=timezone.utc)
+            date_obj = date_obj.astimezone()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            date_obj = datetime.now().astimezone()
         
-        # Sanitize body content
-        body = self._sanitize_email_content(body)
+        if headers_only:
+            body = ""
+        else:
+            # Extract body
+            body = self._extract_email_body(msg)
+            
+            # Sanitize body content
+            body = self._sanitize_email_content(body)
         
-        return {
-            "uid": uid,
-            "from": from_header,
-            "to": to_header,
-            "subject": subject,
-            "date": date_obj.strftime("%Y-%m-%d %H:%M:%S"),
-            "body": body[:5000],  # Limit body size
-        }
+        return Email(
+            uid=uid,
+            raw_from=msg.get("From", ""),
+            raw_to=msg.get("To", ""),
+            raw_subject=msg.get("Subject", ""),
+            date=date_obj.isoformat(sep=" ", timespec="seconds"),
+            body=body,  # Already capped by _sanitize_email_content
+        )
     
     def fetch_emails(self, folder: str = "INBOX", max_count: int = 10, 
-                     search_criteria: str = "ALL") -> List[Dict]:
+                     search_criteria: Union[str, List[Tuple[str, bytes]]] = "ALL",
+                     preview: bool = False,
+                     since_uid: Optional[int] = None, headers_only: bool = False) -> List[Email]:
         """
         Fetch emails from specified folder
         
         Args:
             folder: Email folder (default: INBOX)
             max_count: Maximum number of emails to fetch
-            search_criteria: IMAP search criteria (default: ALL)
+            search_criteria: IMAP search criteria (default: ALL), or a list of
+                (criteria, literal) searches whose results are merged
+            preview: Fetch only headers and the start of the body, in batches
+            since_uid: Only return emails with a UID greater than this; when
+                more than max_count match, the oldest max_count are returned so
+                the caller can continue from the highest UID it got
+            headers_only: Fetch and parse headers only ("body" is empty)
         
         Returns:
-            List of email dictionaries
+            List of Email records ("uid" holds the IMAP UID)
         """
         if not self.connected:
             raise ConnectionError("Not connected to Gmail. Call connect() first.")
         
+        with self._lock:
+            try:
+                return self._fetch_emails(folder, max_count, search_criteria, preview,
+                                          since_uid, headers_only)
+            except (imaplib.IMAP4.abort, OSError):
+                # The server dropped the (idle) connection: log in again, retry once
+                self.reconnect()
+                return self._fetch_emails(folder, max_count, search_criteria, preview,
+                                          since_uid, headers_only)
+    
+    def _fetch_emails(self, folder: str, max_count: int,
+                      search_criteria: Union[str, List[Tuple[str, bytes]]],
+                      preview: bool, since_uid: Optional[int] = None,
+                      headers_only: bool = False) -> List[Email]:
+        """Fetch emails; caller must hold the connection lock"""
         try:
             # Select folder
-            self.imap.select(folder, readonly=True)
+            _, exists = self.imap.select(folder, readonly=True)
+            _, validity = self.imap.response("UIDVALIDITY")
+            _, uidnext = self.imap.response("UIDNEXT")
+            if validity and validity[0]:
+                self._uidvalidity[folder] = validity[0].decode()
+            if uidnext and uidnext[0]:
+                self._uidnext[folder] = uidnext[0]
+            # New mail changes UIDNEXT, expunges change the message count
+            state = tuple(v[0] if v else None for v in (exists, validity, uidnext))
             
-            # Search for emails
-            _, message_numbers = self.imap.search(None, search_criteria)
+            # Search by UID: unlike sequence numbers, UIDs survive EXPUNGEs
+            if since_uid is not None:
+                uid_range = f"UID {since_uid + 1}:*"
+                if isinstance(search_criteria, str):
+                    search_criteria = f"{uid_range} {search_criteria}"
+                else:
+                    search_criteria = [(f"{uid_range} {c}", lit) for c, lit in search_criteria]
+            msg_ids = self._search_uids(folder, search_criteria, state)
             
-            if not message_numbers[0]:
+            if not msg_ids:
                 return []
             
-            # Get message IDs (most recent first)
-            msg_ids = message_numbers[0].split()
-            msg_ids = msg_ids[-max_count:] if len(msg_ids) > max_count else msg_ids
+            if since_uid is not None:
+                # "n:*" always matches the highest UID, even when it is below n
+                msg_ids = [i for i in msg_ids if int(i) > since_uid]
+                # Keep the oldest max_count, so nothing above since_uid is skipped
+                msg_ids = msg_ids[:max_count]
+            else:
+                # Keep the newest max_count
+                msg_ids = msg_ids[-max_count:]
             msg_ids = list(reversed(msg_ids))  # Most recent first
             
-            emails = []
+            if headers_only:
+                return self.fetch_emails_batched(msg_ids, f"({HEADER_FIELDS})", headers_only=True)
+            if preview:
+                return self.fetch_emails_batched(msg_ids)
+            return self.fetch_emails_text(msg_ids)
+        
+        except (imaplib.IMAP4.abort, OSError):
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to fetch emails: {str(e)}")
+    
+    def _search_uids(self, folder: str, search_criteria: Union[str, List[Tuple[str, bytes]]],
+                     state: tuple) -> List[bytes]:
+        """UID SEARCH the selected folder, reusing recent results while it is unchanged"""
+        key = (folder, search_criteria if isinstance(search_criteria, str) else tuple(search_criteria))
+        cached = self._search_cache.get(key)
+        if cached and cached[0] == state and time.monotonic() - cached[1] < SEARCH_CACHE_TTL:
+            return cached[2]
+        
+        if isinstance(search_criteria, str):
+            _, data = self.imap.uid("SEARCH", None, search_criteria)
+            uids = data[0].split() if data and data[0] else []
+        else:
+            found = set()
+            for criteria, literal in search_criteria:
+                self.imap.literal = literal
+                _, data = self.imap.uid("SEARCH", "CHARSET", "UTF-8", criteria)
+                if data and data[0]:
+                    found.update(data[0].split())
+            uids = sorted(found, key=int)
+        
+        self._search_cache[key] = (state, time.monotonic(), uids)
+        if len(self._search_cache) > SEARCH_CACHE_SIZE:
+            del self._search_cache[next(iter(self._search_cache))]
+        return uids
+    
+    def fetch_emails_batched(self, msg_ids: List[bytes], parts: str = PREVIEW_FETCH_PARTS,
+                             batch_size: Optional[int] = None,
+                             headers_only: bool = False) -> List[Email]:
+        """
+        Fetch several messages per FETCH command instead of one round trip each
+        
+        Args:
+            msg_ids: Message UIDs, in the order results should be returned
+            parts: FETCH data items (default: headers + first 2 KB of body)
+            batch_size: Maximum message ids per FETCH command (default: fetch_batch_size)
+            headers_only: Parse headers only (pair with a header-only parts spec)
+        
+        Returns:
+            List of Email records
+        """
+        fetched = self._fetch_sections(msg_ids, parts, batch_size)
+        raw = {msg_id: self._join_sections(sections) for msg_id, sections in fetched.items()}
+        return self._parse_in_order(msg_ids, raw, headers_only)
+    
+    def fetch_emails_text(self, msg_ids: List[bytes]) -> List[Email]:
+        """
+        Fetch headers and the single body part the summary needs
+        
+        Reads each message's BODYSTRUCTURE first, then downloads only its
+        text/plain part (text/html if there is none), so attachments and
+        alternative HTML bodies never cross the wire.
+        
+        Args:
+            msg_ids: Message UIDs, in the order results should be returned
+        
+        Returns:
+            List of Email records
+        """
+        with self._lock:
+            structures = self._fetch_bodystructures(msg_ids)
+            
+            # Messages whose text lives in the same part are fetched together
+            groups: Dict[Optional[str], List[bytes]] = {}
+            picked = {}
             for msg_id in msg_ids:
-                try:
-                    _, msg_data = self.imap.fetch(msg_id, "(RFC822)")
-                    
-                    if msg_data and msg_data[0]:
-                        email_dict = self._parse_email(msg_data[0][1], msg_id.decode())
-                        emails.append(email_dict)
-                except Exception as e:
-                    print(f"Warning: Failed to parse email {msg_id}: {e}")
+                if msg_id not in structures:
+                    groups.setdefault(None, []).append(msg_id)
                     continue
+                picked[msg_id] = self._pick_text_part(structures[msg_id])
+                part = picked[msg_id][0] if picked[msg_id] else ""
+                groups.setdefault(part, []).append(msg_id)
             
-            return emails
+            raw = {}
+            for part, ids in groups.items():
+                if part is None:
+                    # Unreadable BODYSTRUCTURE: take the start of the raw body
+                    parts = f"({HEADER_FIELDS} BODY.PEEK[TEXT]<0.{BODY_FETCH_LIMIT}>)"
+                    fetched = self._fetch_sections(ids, parts)
+                    raw.update((i, self._join_sections(s)) for i, s in fetched.items())
+                    continue
+                
+                if part:
+                    parts = f"({HEADER_FIELDS} BODY.PEEK[{part}]<0.{BODY_FETCH_LIMIT}>)"
+                else:
+                    parts = f"({HEADER_FIELDS})"
+                for msg_id, sections in self._fetch_sections(ids, parts).items():
+                    header = sections.get(b"BODY[HEADER]", b"")
+                    if not part:
+                        raw[msg_id] = header
+                        continue
+                    body = sections.get(f"BODY[{part}]".encode(), b"")
+                    raw[msg_id] = self._join_text_part(header, body, *picked[msg_id][1:])
         
-        except Exception as e:
-            raise Exception(f"Failed to fetch emails: {str(e)}")
+        return self._parse_in_order(msg_ids, raw)
+    
+    def _fetch_sections(self, msg_ids: List[bytes], parts: str,
+                        batch_size: Optional[int] = None) -> Dict[bytes, Dict[bytes, bytes]]:
+        """FETCH parts for msg_ids in batches; returns {msg_id: {section: literal}}"""
+        batch_size = batch_size or self.fetch_batch_size
+        fetched = {}
+        with self._lock:
+            for start in range(0, len(msg_ids), batch_size):
+                data = self._fetch_batch(msg_ids[start:start + batch_size], parts)
+                fetched.update(self._split_fetch_response(data))
+        return fetched
+    
+    def _parse_in_order(self, msg_ids: List[bytes], raw: Dict[bytes, bytes],
+                        headers_only: bool = False) -> List[Email]:
+        """Parse raw messages, returned in msg_ids order"""
+        # Servers answer in mailbox order; fill slots in the caller's order
+        emails = [None] * len(msg_ids)
+        for idx, msg_id in enumerate(msg_ids):
+            msg_data = raw.get(msg_id)
+            if msg_data is None:
+                continue
+            try:
+                emails[idx] = self._parse_email(msg_data, msg_id.decode(), headers_only)
+            except Exception as e:
+                print(f"Warning: Failed to parse email {msg_id}: {e}")
+        
+        return [email_obj for email_obj in emails if email_obj is not None]
+    
+    def _fetch_bodystructures(self, msg_ids: List[bytes]) -> Dict[bytes, list]:
+        """FETCH and parse BODYSTRUCTURE for msg_ids (unparseable ones are left out)"""
+        structures = {}
+        with self._lock:
+            for start in range(0, len(msg_ids), self.fetch_batch_size):
+                data = self._fetch_batch(msg_ids[start:start + self.fetch_batch_size], "(BODYSTRUCTURE)")
+                
+                for seq, response in self._join_fetch_lines(data):
+                    pos = response.find(b"BODYSTRUCTURE ")
+                    if pos < 0:
+                        continue
+                    try:
+                        structure, end = _parse_imap_list(response, pos + len(b"BODYSTRUCTURE "))
+                    except ValueError as e:
+                        print(f"Warning: Failed to parse BODYSTRUCTURE of email {seq}: {e}")
+                        continue
+                    # Look for the UID outside the structure, whose strings may contain anything
+                    uid = _FETCH_UID_RE.search(response[:pos] + b" " + response[end:])
+                    if uid and isinstance(structure, list) and structure:
+                        structures[uid.group(1)] = structure
+        return structures
+    
+    def _join_fetch_lines(self, data) -> List[Tuple[bytes, bytes]]:
+        """Reassemble each message's FETCH response, literals inlined as {n}CRLF<bytes>"""
+        messages = []
+        for item in data:
+            if isinstance(item, tuple):
+                line = item[0] + b"\r\n" + item[1]
+            elif isinstance(item, bytes):
+                line = item
+            else:
+                continue
+            start = _FETCH_START_RE.match(line)
+            if start:
+                messages.append((start.group(1), bytearray()))
+            if messages:
+                messages[-1][1].extend(line)
+        return [(msg_id, bytes(response)) for msg_id, response in messages]
+    
+    def _text_parts(self, structure: list, number: str = ""):
+        """Yield (part, subtype, charset, encoding) for inline text/plain and text/html leaves"""
+        if isinstance(structure[0], list):
+            # Multipart: child bodies come first, then the subtype and extension data
+            for idx, child in enumerate(structure, 1):
+                if not isinstance(child, list):
+                    break
+                yield from self._text_parts(child, f"{number}.{idx}" if number else str(idx))
+            return
+        
+        if len(structure) < 7 or (structure[0] or "").lower() != "text":
+            return
+        subtype = (structure[1] or "").lower()
+        if subtype not in ("plain", "html"):
+            return
+        disposition = structure[9] if len(structure) > 9 else None
+        if isinstance(disposition, list) and (disposition[0] or "").lower() == "attachment":
+            return
+        
+        params = structure[2] if isinstance(structure[2], list) else []
+        charset = dict(zip((str(k).lower() for k in params[::2]), params[1::2])).get("charset")
+        yield number or "1", subtype, charset or "utf-8", structure[5] or "7BIT"
     
-    def fetch_unread_emails(self, max_count: int = 50) -> List[Dict]:
+    def _pick_text_part(self, structure: list) -> Optional[Tuple[str, str, str, str]]:
+        """
+        Choose the body part to download from a parsed BODYSTRUCTURE
+        
+        Returns:
+            (part number, subtype, charset, transfer encoding) of the first
+            text/plain part, else the first text/html part, else None
+        """
+        parts = list(self._text_parts(structure))
+        return next((p for p in parts if p[1] == "plain"), parts[0] if parts else None)
+    
+    def _join_text_part(self, header: bytes, body: bytes, subtype: str,
+                        charset: str, encoding: str) -> bytes:
+        """Build a single-part message from the top-level header and one (possibly cut) body part"""
+        if encoding.lower() == "base64":
+            # A partial FETCH may end mid-quantum, which would fail to decode
+            body = re.sub(rb'[^A-Za-z0-9+/=]', b'', body)
+            body = body[:len(body) - len(body) % 4]
+        lines = [_CONTENT_HEADER_RE.sub(b"", header).rstrip(b"\r\n")] if header.strip() else []
+        lines.append(f'Content-Type: text/{subtype}; charset="{charset}"'.encode())
+        lines.append(f"Content-Transfer-Encoding: {encoding}".encode())
+        return b"\r\n".join(lines) + b"\r\n\r\n" + body
+    
+    def _fetch_batch(self, batch: List[bytes], parts: str) -> list:
+        """FETCH a batch in one command, one id at a time if the server rejects it"""
+        try:
+            _, data = self.imap.uid("FETCH", b",".join(batch).decode(), parts)
+            return data
+        except imaplib.IMAP4.abort:
+            raise
+        except imaplib.IMAP4.error as e:
+            # e.g. "BAD parse error: maximum request size exceeded"
+            if len(batch) == 1:
+                raise
+            print(f"Warning: Batched FETCH failed ({e}); fetching one by one")
+        
+        data = []
+        for msg_id in batch:
+            try:
+                _, msg_data = self.imap.uid("FETCH", msg_id.decode(), parts)
+                data.extend(msg_data)
+            except imaplib.IMAP4.abort:
+                raise
+            except imaplib.IMAP4.error as e:
+                print(f"Warning: Failed to fetch email {msg_id}: {e}")
+        return data
+    
+    def _split_fetch_response(self, data) -> Dict[bytes, Dict[bytes, bytes]]:
+        """
+        Group a multi-message UID FETCH response into {uid: {section: literal}}
+        
+        imaplib returns each literal as a (prelude, bytes) tuple; a prelude that
+        starts with "<seq> (" opens a new message, later ones continue it. The
+        UID item may come before or after the literals.
+        """
+        messages = {}
+        sections = None
+        for item in data:
+            prelude, literal = item if isinstance(item, tuple) else (item, None)
+            if not isinstance(prelude, bytes):
+                continue
+            if _FETCH_START_RE.match(prelude):
+                # Messages without literals (e.g. only FLAGS) are skipped
+                sections = {} if literal is not None else None
+            if sections is None:
+                continue
+            uid = _FETCH_UID_RE.search(prelude)
+            if uid:
+                messages[uid.group(1)] = sections
+            section = _FETCH_SECTION_RE.search(prelude)
+            if section and literal is not None:
+                key = section.group(1)
+                if key.startswith(b"BODY[HEADER.FIELDS"):
+                    key = b"BODY[HEADER]"
+                sections[key] = literal
+        return messages
+    
+    def _join_sections(self, sections: Dict[bytes, bytes]) -> bytes:
+        """Rebuild (possibly truncated) raw message bytes from fetched sections"""
+        if b"RFC822" in sections:
+            return sections[b"RFC822"]
+        return sections.get(b"BODY[HEADER]", b"") + sections.get(b"BODY[TEXT]", b"")
+    
+    def fetch_new_emails(self, folder: str = "INBOX", max_count: int = 50,
+                         preview: bool = False) -> List[Email]:
+        """
+        Fetch only emails that arrived since the previous call for this folder
+        
+        The first call returns the latest max_count emails. The last UID seen is
+        remembered per folder (and saved to state_file, if set); it is discarded
+        when the folder's UIDVALIDITY changes, since UIDs are then reassigned.
+        When more than max_count new emails arrived, the oldest of them are
+        returned and the rest come with the following calls.
+        
+        Args:
+            folder: Email folder (default: INBOX)
+            max_count: Maximum number of emails to fetch
+            preview: Fetch only headers and the start of the body
+        
+        Returns:
+            List of Email records, most recent first
+        """
+        with self._lock:
+            validity, last_uid = self._last_seen.get(folder, (None, None))
+            emails = self.fetch_emails(folder, max_count, preview=preview, since_uid=last_uid)
+            if last_uid is not None and self._uidvalidity.get(folder) != validity:
+                emails = self.fetch_emails(folder, max_count, preview=preview)
+                last_uid = None
+            
+            if emails:
+                newest = max(int(e.uid) for e in emails)
+                self._last_seen[folder] = (self._uidvalidity.get(folder), max(newest, last_uid or 0))
+                self._save_state()
+            return emails
+    
+    def _load_state(self) -> Dict[str, Tuple[str, int]]:
+        """Read last-seen UIDs from state_file"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return {folder: (v[0], int(v[1])) for folder, v in json.load(f).items()}
+        except (OSError, ValueError, TypeError, IndexError) as e:
+            print(f"Warning: Ignoring unreadable state file {self.state_file}: {e}")
+            return {}
+    
+    def _save_state(self):
+        """Write last-seen UIDs to state_file (atomically)"""
+        if not self.state_file:
+            return
+        tmp_path = self.state_file + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._last_seen, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            print(f"Warning: Failed to save state file {self.state_file}: {e}")
+    
+    def fetch_unread_emails(self, max_count: int = 50, preview: bool = False) -> List[Email]:
         """Fetch unread emails"""
         return self.fetch_emails(
             folder="INBOX",
             max_count=max_count,
-            search_criteria="UNSEEN"
+            search_criteria="UNSEEN",
+            preview=preview
         )
     
-    def search_emails(self, query: str, max_count: int = 20) -> List[Dict]:
+    def idle(self, folder: str = "INBOX", timeout: float = IDLE_TIMEOUT,
+             stop: Optional[threading.Event] = None) -> bool:
+        """
+        Wait in IMAP IDLE until the folder changes, timeout passes or stop is set
+        
+        The connection stays busy while waiting, so streaming should use its
+        own client rather than one shared with other callers.
+        
+        Args:
+            folder: Email folder (default: INBOX)
+            timeout: Seconds to wait before leaving IDLE
+            stop: Event that ends the wait early (checked every IDLE_POLL seconds)
+        
+        Returns:
+            True if new mail may have arrived since the folder was last searched
+        """
+        if not self.connected:
+            raise ConnectionError("Not connected to Gmail. Call connect() first.")
+        
+        with self._lock:
+            status, _ = self.imap.select(folder, readonly=True)
+            if status != "OK":
+                raise imaplib.IMAP4.error(f"Cannot select folder {folder}")
+            # Mail that arrived after the last search is reported by this
+            # SELECT, not by the IDLE that follows
+            _, uidnext = self.imap.response("UIDNEXT")
+            known = self._uidnext.get(folder)
+            if known is not None and uidnext and uidnext[0] and uidnext[0] != known:
+                return True
+            
+            # imaplib has no IDLE command before Python 3.14, so speak it directly
+            tag = self.imap._new_tag()
+            self.imap.send(tag + b" IDLE\r\n")
+            changed = False
+            while True:
+                line = self.imap.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("connection closed during IDLE")
+                if line.startswith(b"+"):
+                    break
+                if line.startswith(tag + b" "):
+                    raise imaplib.IMAP4.error(f"IDLE rejected: {line.strip()!r}")
+                # Untagged responses may precede the continuation
+                changed = changed or bool(_IDLE_CHANGE_RE.match(line))
+            
+            try:
+                if not changed:
+                    self._wait_readable(timeout, stop)
+                
+                # Any activity ends the IDLE; the responses that caused it
+                # arrive before the tagged completion of DONE
+                self.imap.send(b"DONE\r\n")
+                while True:
+                    line = self.imap.readline()
+                    if not line:
+                        raise imaplib.IMAP4.abort("connection closed during IDLE")
+                    if line.startswith(tag + b" "):
+                        break
+                    changed = changed or bool(_IDLE_CHANGE_RE.match(line))
+            except BaseException:
+                # The server may still consider the connection idling
+                _pool.discard(self.imap)
+                self.imap = None
+                self.connected = False
+                raise
+            if not line.startswith(tag + b" OK"):
+                raise imaplib.IMAP4.error(f"IDLE failed: {line.strip()!r}")
+            return changed
+    
+    def _wait_readable(self, timeout: float, stop: Optional[threading.Event]):
+        """Block until response data is waiting, timeout passes or stop is set"""
+        sock = self.imap.sock
+        deadline = time.monotonic() + timeout
+        readable = False
+        while True:
+            peeked = self._peek_response()
+            if peeked:
+                return
+            if readable and peeked == b"":
+                # Readable yet nothing to read: the server closed the connection
+                raise imaplib.IMAP4.abort("connection closed during IDLE")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (stop is not None and stop.is_set()):
+                return
+            readable = bool(select.select([sock], [], [], min(remaining, IDLE_POLL))[0])
+    
+    def _peek_response(self) -> Optional[bytes]:
+        """
+        Peek at pending response bytes without blocking
+        
+        select() only sees the socket, not lines already read into imaplib's
+        file buffer or TLS records decrypted ahead. A socket timeout cannot be
+        used instead: it leaves the file object permanently unreadable.
+        
+        Returns:
+            Buffered bytes; b"" if none are waiting or at EOF; None if the
+            read would block (e.g. a TLS record is only partly received)
+        """
+        sock = self.imap.sock
+        previous = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            return self.imap.file.peek(1)
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return None
+        finally:
+            sock.settimeout(previous)
+    
+    def stream_unread(self, callback, folder: str = "INBOX", max_count: int = 50,
+                      preview: bool = True, stop: Optional[threading.Event] = None,
+                      idle_timeout: float = IDLE_TIMEOUT):
+        """
+        Call callback with new unread emails as they arrive, using IMAP IDLE
+        
+        Unread emails already in the folder are delivered first, oldest first,
+        max_count at a time. After that the folder is only searched when the
+        server reports a change, and only for UIDs above the newest one delivered.
+        
+        Args:
+            callback: Called with a non-empty list of Email records
+            folder: Email folder (default: INBOX)
+            max_count: Maximum number of emails per callback
+            preview: Fetch only headers and the start of the body
+            stop: Event that ends the stream (within IDLE_POLL seconds)
+            idle_timeout: Seconds per IDLE before it is re-issued
+        """
+        last_uid = 0
+        changed = True
+        while stop is None or not stop.is_set():
+            if changed:
+                emails = self.fetch_emails(folder, max_count, "UNSEEN",
+                                           preview=preview, since_uid=last_uid)
+                if emails:
+                    last_uid = max([int(e.uid) for e in emails] + [last_uid])
+                    callback(emails)
+                    if len(emails) >= max_count:
+                        continue  # More may be waiting above last_uid
+            try:
+                changed = self.idle(folder, idle_timeout, stop)
+            except (imaplib.IMAP4.abort, OSError) as e:
+                print(f"IDLE interrupted ({e}), reconnecting...")
+                self.reconnect()
+                changed = True
+    
+    def search_emails(self, query: str, max_count: int = 20, preview: bool = False) -> List[Email]:
         """
         Search emails by subject or body
         
         Args:
             query: Search query
             max_count: Maximum results
+            preview: Fetch only headers and the start of the body
         
         Returns:
             List of matching emails
         """
         # IMAP search for subject or text
-        search_criteria = f'OR SUBJECT "{query}" BODY "{query}"'
+        search_criteria = _text_search(["SUBJECT", "BODY"], query)
         return self.fetch_emails(
             folder="INBOX",
             max_count=max_count,
-            search_criteria=search_criteria
+            search_criteria=search_criteria,
+            preview=preview
         )
     
-    def fetch_emails_from_sender(self, sender: str, max_count: int = 20) -> List[Dict]:
+    def fetch_emails_from_sender(self, sender: str, max_count: int = 20,
+                                 preview: bool = False) -> List[Email]:
         """Fetch emails from specific sender"""
-        search_criteria = f'FROM "{sender}"'
+        search_criteria = _text_search(["FROM"], sender)
         return self.fetch_emails(
             folder="INBOX",
             max_count=max_count,
-            search_criteria=search_criteria
+            search_criteria=search_criteria,
+            preview=preview
         )
     
+    def fetch_emails_multi(self, queries: List[Tuple[str, str, int]],
+                           preview: bool = False) -> List[Email]:
+        """
+        Run several folder/search fetches in parallel, one connection each
+        
+        Args:
+            queries: (folder, search_criteria, max_count) tuples
+            preview: Fetch headers and the start of each body only
+        
+        Returns:
+            Emails of all queries, in query order
+        """
+        if not queries:
+            return []
+        
+        def run(query):
+            folder, criteria, max_count = query
+            # imaplib connections cannot be shared between threads
+            with GmailIMAPClient(self.email_address, self.app_password,
+                                 self.fetch_batch_size) as client:
+                return client.fetch_emails(folder, max_count, criteria, preview=preview)
+        
+        results = [[] for _ in queries]
+        with ThreadPoolExecutor(max_workers=min(len(queries), MAX_PARALLEL_CONNECTIONS)) as pool:
+            futures = {pool.submit(run, query): idx for idx, query in enumerate(queries)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        
+        return [email_obj for emails in results for email_obj in emails]
+    
+    def append_message(self, folder: str, message: bytes, flags: str = "") -> None:
+        """
+        Append a raw message to a folder
+        
+        Args:
+            folder: Destination folder (e.g. [Gmail]/Drafts)
+            message: Raw RFC822 message bytes
+            flags: Optional IMAP flags
+        """
+        with self._lock:
+            self.imap.append(
+                folder,
+                flags,
+                imaplib.Time2Internaldate(time.time()),
+                message
+            )
+    
     def __enter__(self):
         """Context manager entry"""
         return self.connect()
@@ -332,6 +1378,53 @@ class GmailSMTPClient:
         self.app_password = app_password
         self.imap_client = imap_client
         self.smtp = None
+        # smtplib sessions are not thread-safe; one send at a time
+        self._smtp_lock = threading.Lock()
+    
+    def _ensure_smtp(self) -> smtplib.SMTP_SSL:
+        """Return the logged-in SMTP session, reconnecting if it was dropped"""
+        if self.smtp is not None:
+            try:
+                self.smtp.noop()
+                return self.smtp
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self.smtp = None
+        
+        smtp_server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
+        try:
+            smtp_server.login(self.email_address, self.app_password)
+        except Exception:
+            smtp_server.close()
+            raise
+        self.smtp = smtp_server
+        return smtp_server
+    
+    def _sendmail(self, recipients: List[str], message: str) -> None:
+        """Send over the shared session (TLS + AUTH only paid on the first send)"""
+        with self._smtp_lock:
+            smtp_server = self._ensure_smtp()
+            try:
+                smtp_server.sendmail(self.email_address, recipients, message)
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # No retry: the server may already have accepted the message,
+                # and sending it again could deliver it twice
+                smtp_server.close()
+                self.smtp = None
+                raise
+    
+    def close(self):
+        """Close the SMTP session"""
+        with self._smtp_lock:
+            if self.smtp is not None:
+                try:
+                    self.smtp.quit()
+                except Exception:
+                    pass
+                self.smtp = None
+    
+    def __del__(self):
+        """Cleanup on deletion"""
+        self.close()
     
     def send_email(
         self,
@@ -372,10 +1465,7 @@ class GmailSMTPClient:
             else:
                 recipients = [to]
             
-            # Connect to SMTP server
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp_server:
-                smtp_server.login(self.email_address, self.app_password)
-                smtp_server.sendmail(self.email_address, recipients, msg.as_string())
+            self._sendmail(recipients, msg.as_string())
             
             print(f" Email sent to {to}")
             return True
@@ -384,6 +1474,34 @@ class GmailSMTPClient:
             print(f" Failed to send email: {e}")
             return False
     
+    def send_emails_bulk(self, to: List[str], subject: str, body: str) -> bool:
+        """
+        Send one email to several recipients over a single SMTP session
+        
+        Args:
+            to: Recipient email addresses
+            subject: Email subject
+            body: Email body
+        
+        Returns:
+            True if sent successfully, False otherwise
+        """
+        try:
+            msg = MIMEText(body)
+            msg['From'] = self.email_address
+            msg['To'] = ', '.join(to)
+            msg['Subject'] = subject
+            
+            # One message; sendmail issues a RCPT TO per recipient
+            self._sendmail(to, msg.as_string())
+            
+            print(f" Email sent to {', '.join(to)}")
+            return True
+            
+        except Exception as e:
+            print(f" Failed to send email: {e}")
+            return False
+    
     def create_draft(
         self,
         to: str,
@@ -423,12 +1541,7 @@ class GmailSMTPClient:
             utf8_message = str(msg).encode('utf-8')
             
             # Append to Drafts folder
-            self.imap_client.imap.append(
-                '[Gmail]/Drafts',
-                '',
-                imaplib.Time2Internaldate(time.time()),
-                utf8_message
-            )
+            self.imap_client.append_message('[Gmail]/Drafts', utf8_message)
             
             print(f" Draft created for {to}")
             return True
@@ -0,0 +1,45 @@
+"""Structured output schemas for email summaries"""
+
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class EmailSummary(BaseModel):
+    """Summary of a single email"""
+    
+    sender: str = Field(description="Sender name and email address")
+    subject: str = Field(description="Subject line")
+    date: str = Field(description="Date received")
+    key_points: str = Field(description="Key points from the email body, one or two sentences")
+    action_items: Optional[str] = Field(
+        default=None,
+        description="Action items, deadlines or requests, if any"
+    )
+    security_warning: Optional[str] = Field(
+        default=None,
+        description="Why the email looks like an injection or phishing attempt, if it does"
+    )
+
+
+class EmailDigest(BaseModel):
+    """Summaries of a list of emails, in the order given"""
+    
+    emails: List[EmailSummary]
+    
+    def render(self) -> str:
+        """Format the digest as plain text for the terminal"""
+        if not self.emails:
+            return "No emails found."
+        
+        lines = []
+        for idx, item in enumerate(self.emails, 1):
+            lines.append(f"{idx}. {item.subject}")
+            lines.append(f"   From: {item.sender}")
+            lines.append(f"   Date: {item.date}")
+            lines.append(f"   {item.key_points}")
+            if item.action_items:
+                lines.append(f"   Action items: {item.action_items}")
+            if item.security_warning:
+                lines.append(f"   SECURITY WARNING: {item.security_warning}")
+            lines.append("")
+        return "\n".join(lines).rstrip()
@@ -0,0 +1,367 @@
+"""LangChain tools for Gmail operations
+
+The tools are created once per process so their schemas are parsed a single
+time and compiled executors can be shared between GmailAIAgent instances.
+Each call acts on the agent that is currently running (see GmailAIAgent._bound).
+"""
+
+import sys
+import time
+import queue
+import select
+import threading
+from typing import List, Optional
+from langchain.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from .agent import _EMAIL_RE, _current_agent, _format_emails
+
+# Seconds to wait for a send confirmation before giving up
+CONFIRM_TIMEOUT = 30
+
+# Tool calls from one LLM turn run concurrently; serialize terminal prompts
+_confirm_lock = threading.Lock()
+
+# Lines read from non-terminal stdin by _read_piped_line's helper thread
+_stdin_lines = queue.Queue()
+# Held while a helper thread is blocked reading stdin
+_stdin_reading = threading.Lock()
+
+
+def _read_piped_line(timeout: float) -> Optional[str]:
+    """
+    Read a line from piped stdin in a helper thread, waiting at most timeout
+    
+    select() cannot be used here: sys.stdin may already hold the line in its
+    buffer. A line that arrives after a timeout answers the next prompt.
+    """
+    if _stdin_reading.acquire(blocking=False):
+        def reader():
+            line = sys.stdin.readline()
+            _stdin_reading.release()
+            _stdin_lines.put(line)
+        
+        threading.Thread(target=reader, name="gmail-confirm-stdin", daemon=True).start()
+    try:
+        return _stdin_lines.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+def _read_console_line(timeout: float) -> Optional[str]:
+    """Read a line from the Windows console, polling the keyboard until timeout"""
+    import msvcrt
+    
+    deadline = time.monotonic() + timeout
+    chars = []
+    while time.monotonic() < deadline:
+        while msvcrt.kbhit():
+            char = msvcrt.getwche()
+            if char in "\r\n":
+                print()
+                return "".join(chars)
+            if char == "\b":
+                if chars:
+                    chars.pop()
+                    print(" \b", end="", flush=True)
+            else:
+                chars.append(char)
+        time.sleep(0.05)
+    return None
+
+
+def _read_confirmation(prompt: str, timeout: float = CONFIRM_TIMEOUT) -> Optional[str]:
+    """Read a line from stdin, or return None if nothing arrives within timeout"""
+    print(prompt, end="", flush=True)
+    if not sys.stdin.isatty():
+        line = _read_piped_line(timeout)
+    elif sys.platform == "win32":
+        line = _read_console_line(timeout)
+    else:
+        ready, _, _ = select.select([sys.stdin], [], [], timeout)
+        line = sys.stdin.readline() if ready else None
+    if line is None:
+        print()
+        return None
+    return line.strip()
+
+
+def _running_agent():
+    """Return the GmailAIAgent the current tool call acts on"""
+    agent = _current_agent.get(None)
+    if agent is None:
+        raise RuntimeError(
+            "Gmail tools act on the agent that is running them; call them through "
+            "GmailAIAgent.run(), arun(), stream() or send_pending(), not directly"
+        )
+    return agent
+
+
+def _confirm_send(agent, recipients: str, subject: str, body: str) -> Optional[str]:
+    """
+    Ask the user to confirm a send at the terminal
+    
+    Returns:
+        None if the send may go ahead, otherwise the message to return to the LLM
+    """
+    if agent.auto_confirm:
+        return None
+    
+    with _confirm_lock:
+        print(f"\n  CONFIRM: About to send email")
+        print(f"   To: {recipients}")
+        print(f"   Subject: {subject}")
+        print(f"   Body preview: {body[:100]}...")
+        
+        confirmation = _read_confirmation("\n   Type 'YES' to confirm sending: ")
+    
+    if confirmation is None:
+        return "Email sending cancelled: confirmation timed out."
+    if confirmation != "YES":
+        return "Email sending cancelled by user."
+    return None
+
+
+@tool
+def fetch_recent_emails(max_count: int = 10) -> str:
+    """
+    Fetch recent emails from inbox.
+    
+    Args:
+        max_count: Maximum number of emails to fetch (default: 10)
+    
+    Returns:
+        String containing email details
+    """
+    agent = _running_agent()
+    try:
+        emails = agent._cached_fetch("fetch_emails", max_count=max_count, preview=True)
+        return _format_emails(emails)
+    except Exception as e:
+        return f"Error fetching emails: {str(e)}"
+
+
+@tool
+def fetch_unread_emails() -> str:
+    """
+    Fetch all unread emails from inbox.
+    
+    Returns:
+        String containing unread email details
+    """
+    agent = _running_agent()
+    try:
+        emails = agent._imap_call("fetch_unread_emails", preview=True)
+        if not emails:
+            return "No unread emails found."
+        return _format_emails(emails)
+    except Exception as e:
+        return f"Error fetching unread emails: {str(e)}"
+
+
+@tool
+def search_emails_by_query(query: str, max_count: int = 20) -> str:
+    """
+    Search emails by subject or body content.
+    
+    Args:
+        query: Search query string
+        max_count: Maximum results to return
+    
+    Returns:
+        String containing matching email details
+    """
+    agent = _running_agent()
+    try:
+        emails = agent._cached_fetch("search_emails", query, max_count=max_count, preview=True)
+        if not emails:
+            return f"No emails found matching '{query}'."
+        return _format_emails(emails)
+    except Exception as e:
+        return f"Error searching emails: {str(e)}"
+
+
+@tool
+def fetch_emails_from_sender(sender_email: str, max_count: int = 20) -> str:
+    """
+    Fetch emails from a specific sender.
+    
+    Args:
+        sender_email: Email address of the sender
+        max_count: Maximum emails to fetch
+    
+    Returns:
+        String containing emails from sender
+    """
+    agent = _running_agent()
+    try:
+        emails = agent._cached_fetch("fetch_emails_from_sender", sender_email, max_count=max_count, preview=True)
+        if not emails:
+            return f"No emails found from {sender_email}."
+        return _format_emails(emails)
+    except Exception as e:
+        return f"Error fetching emails from sender: {str(e)}"
+
+
+@tool
+def summarize_recent_emails(max_count: int = 10) -> str:
+    """
+    Fetch recent emails from inbox and return a finished summary.
+    Prefer this over fetch_recent_emails when the user only wants a summary.
+    
+    Args:
+        max_count: Maximum number of emails to summarize (default: 10)
+    
+    Returns:
+        Summary of the emails
+    """
+    agent = _running_agent()
+    try:
+        emails = agent._cached_fetch("fetch_emails", max_count=max_count, preview=True)
+        return agent._summarize_emails(emails)
+    except Exception as e:
+        return f"Error summarizing emails: {str(e)}"
+
+
+@tool
+def summarize_emails_from_sender(sender_email: str, max_count: int = 20) -> str:
+    """
+    Fetch emails from a specific sender and return a finished summary.
+    Prefer this over fetch_emails_from_sender when the user only wants a summary.
+    
+    Args:
+        sender_email: Email address of the sender
+        max_count: Maximum emails to summarize
+    
+    Returns:
+        Summary of the emails from sender
+    """
+    agent = _running_agent()
+    try:
+        emails = agent._cached_fetch("fetch_emails_from_sender", sender_email, max_count=max_count, preview=True)
+        if not emails:
+            return f"No emails found from {sender_email}."
+        return agent._summarize_emails(emails)
+    except Exception as e:
+        return f"Error summarizing emails from sender: {str(e)}"
+
+
+@tool
+def send_email(to: str, subject: str, body: str) -> str:
+    """
+    Send an email to a recipient. Use this tool IMMEDIATELY when user asks to send email.
+    
+    SECURITY: This action requires explicit user confirmation at the terminal.
+    The tool itself will handle the confirmation prompt.
+    
+    Args:
+        to: Recipient email address (must be valid email format)
+        subject: Email subject line
+        body: Email body content
+    
+    Returns:
+        Success or error message
+    """
+    agent = _running_agent()
+    # Basic email validation
+    if not _EMAIL_RE.match(to):
+        return f"Error: Invalid recipient email address '{to}'"
+    
+    # Security check: Require user confirmation
+    cancelled = _confirm_send(agent, to, subject, body)
+    if cancelled:
+        agent.pending_send = {"to": to, "subject": subject, "body": body}
+        return cancelled
+    
+    success = agent.smtp_client.send_email(to, subject, body)
+    
+    if success:
+        agent.pending_send = None
+        # Mailbox state changed; drop cached fetches
+        agent._fetch_cache.cache_clear()
+        return f" Email successfully sent to {to}"
+    else:
+        return f" Failed to send email to {to}"
+
+
+@tool
+def send_emails_bulk(to: List[str], subject: str, body: str) -> str:
+    """
+    Send one email to several recipients at once. Use this instead of calling
+    send_email repeatedly when the user names more than one recipient.
+    
+    SECURITY: This action requires explicit user confirmation at the terminal.
+    The tool itself will handle the confirmation prompt.
+    
+    Args:
+        to: Recipient email addresses (each must be valid email format)
+        subject: Email subject line
+        body: Email body content
+    
+    Returns:
+        Success or error message
+    """
+    agent = _running_agent()
+    if not to:
+        return "Error: No recipients given"
+    invalid = [r for r in to if not _EMAIL_RE.match(r)]
+    if invalid:
+        return f"Error: Invalid recipient email address(es): {', '.join(invalid)}"
+    
+    recipients = ", ".join(to)
+    # Security check: one confirmation covers every recipient
+    cancelled = _confirm_send(agent, recipients, subject, body)
+    if cancelled:
+        agent.pending_send = {"to": list(to), "subject": subject, "body": body}
+        return cancelled
+    
+    success = agent.smtp_client.send_emails_bulk(list(to), subject, body)
+    
+    if success:
+        agent.pending_send = None
+        agent._fetch_cache.cache_clear()
+        return f" Email successfully sent to {recipients}"
+    else:
+        return f" Failed to send email to {recipients}"
+
+
+@tool
+def create_draft_email(to: str, subject: str, body: str) -> str:
+    """
+    Create a draft email (saved to Drafts folder, not sent).
+    
+    Args:
+        to: Recipient email address
+        subject: Email subject line
+        body: Email body content
+    
+    Returns:
+        Success or error message
+    """
+    agent = _running_agent()
+    # Basic email validation
+    if not _EMAIL_RE.match(to):
+        return f"Error: Invalid recipient email address '{to}'"
+    
+    success = agent.smtp_client.create_draft(to, subject, body)
+    
+    if success:
+        agent._fetch_cache.cache_clear()
+        return f" Draft created for {to}. Check your Gmail Drafts folder."
+    else:
+        return f" Failed to create draft for {to}"
+
+
+TOOLS = [
+    fetch_recent_emails,
+    fetch_unread_emails,
+    search_emails_by_query,
+    fetch_emails_from_sender,
+    summarize_recent_emails,
+    summarize_emails_from_sender,
+    send_email,
+    send_emails_bulk,
+    create_draft_email
+]
+
+# OpenAI function schemas, converted once here instead of on every bind_tools()
+TOOL_SCHEMAS = [convert_to_openai_tool(t) for t in TOOLS]